@@ -13,11 +13,15 @@ import os
 import sys
 import json
 import time
+import uuid
+import hashlib
+import queue
 import serial
 import logging
-import base64
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from typing import List, Dict, Optional
+from collections import Counter, OrderedDict
 from datetime import datetime
 from threading import Thread, Lock
 from flask import Flask, request, jsonify
@@ -45,7 +49,10 @@ if not API_KEY:
     print("Create a .env file with: GOOGLE_API_KEY=your_actual_key_here")
     sys.exit(1)
 
-genai.configure(api_key=API_KEY)
+# REST transport keeps one HTTPS connection alive across calls, so only the
+# first request pays the TLS handshake; the default gRPC path has been seen
+# re-establishing its channel between calls on some SDK versions
+genai.configure(api_key=API_KEY, transport='rest')
 
 # Arduino Configuration
 ARDUINO_PORT = 'COM3'  # Windows. For Mac/Linux: '/dev/ttyUSB0' or '/dev/ttyACM0'
@@ -59,15 +66,18 @@ FLASK_PORT = 5000
 UPLOAD_FOLDER = 'received_images'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-# Logging Setup
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('ml_sorting_system.log'),
-        logging.StreamHandler()
-    ]
-)
+# Logging Setup - handlers run on a QueueListener thread so log calls on
+# the serial/request hot paths never block on disk or stderr writes
+_log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+_log_handlers = [logging.FileHandler('ml_sorting_system.log'), logging.StreamHandler()]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+
+_log_queue = queue.Queue(-1)
+log_listener = QueueListener(_log_queue, *_log_handlers)
+log_listener.start()
+
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(_log_queue)])
 logger = logging.getLogger(__name__)
 
 # Flask App
@@ -78,18 +88,63 @@ arduino_connection = None
 arduino_lock = Lock()
 ml_analyzer = None
 
-# Statistics
-stats = {
-    'total_processed': 0,
-    'safe_to_shred': 0,
-    'requires_preprocessing': 0,
-    'do_not_shred': 0,
-    'discard_items': 0,
-    'left_movements': 0,
-    'right_movements': 0,
-    'errors': 0,
-    'start_time': datetime.now()
-}
+# Sorting pipeline: uploads are queued here and a dedicated worker thread
+# runs the slow ML + servo stages, so the upload request only pays for the
+# disk write. Results are collected in results_cache keyed by job id; the
+# cache is bounded (oldest evicted) so a long-running sorter doesn't leak
+# one result per frame, and pending_jobs tracks ids still in flight so
+# /api/result can tell "queued" apart from "unknown or expired".
+RESULTS_CACHE_SIZE = 256
+job_queue = queue.Queue(maxsize=32)
+results_cache = OrderedDict()
+pending_jobs = set()
+state_lock = Lock()  # Guards results_cache and pending_jobs
+
+def store_result(job_id: str, result: Dict):
+    """Record a finished job's result, evicting the oldest when full"""
+    with state_lock:
+        pending_jobs.discard(job_id)
+        results_cache[job_id] = result
+        if len(results_cache) > RESULTS_CACHE_SIZE:
+            results_cache.popitem(last=False)
+
+# Statistics - a Counter behind its own small lock so any thread can bump
+# a counter without racing the dict, and readers take a consistent snapshot
+_stats = Counter({key: 0 for key in (
+    'total_processed', 'safe_to_shred', 'requires_preprocessing',
+    'do_not_shred', 'discard_items', 'left_movements', 'right_movements',
+    'errors', 'cache_hits',
+)})
+_stats_lock = Lock()
+_start_time = datetime.now()
+
+def bump(key: str, n: int = 1):
+    """Atomically increment a statistics counter"""
+    with _stats_lock:
+        _stats[key] += n
+
+def stats_snapshot() -> Dict:
+    """Return a consistent copy of the statistics counters"""
+    with _stats_lock:
+        return dict(_stats)
+
+def guess_mime_type(filename: str) -> str:
+    """Pick the image MIME type from a filename extension"""
+    return "image/jpeg" if filename.lower().endswith(('.jpg', '.jpeg')) else "image/png"
+
+def persist_image(image_path: str, image_bytes: bytes):
+    """Write image bytes to disk for the audit trail (off the hot path)
+
+    Writes to a .part file and renames into place so any reader of the
+    final path only ever sees a complete file, never a torn write.
+    """
+    tmp_path = image_path + '.part'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(image_bytes)
+        os.replace(tmp_path, image_path)
+    except OSError as e:
+        logger.error(f"Failed to persist image {image_path}: {e}")
 
 # ============================================================================
 # ARDUINO CONTROLLER
@@ -101,15 +156,28 @@ class ArduinoController:
         self.baud_rate = baud_rate
         self.connection = None
         self.connected = False
+        self._rx_q = queue.Queue()  # Lines pushed by the reader thread
+        self._at_center = False  # True once a successful move leaves the servo centered
+        # Precompiled wire bytes for the fixed command set
+        self._cmd_bytes = {c: (c + '\n').encode('ascii')
+                           for c in ('LEFT', 'RIGHT', 'CENTER', 'STATUS', 'TEST')}
     
     def connect(self) -> bool:
         """Connect to Arduino with retry logic"""
         max_retries = 5
         for attempt in range(max_retries):
             try:
-                self.connection = serial.Serial(self.port, self.baud_rate, timeout=3)
+                # Short read timeout so readline() blocks until bytes arrive
+                # instead of us polling in_waiting with a sleep
+                self.connection = serial.Serial(self.port, self.baud_rate, timeout=0.05)
+                self._enable_low_latency()
                 time.sleep(3)  # Wait for Arduino to initialize
-                
+                self.connection.reset_input_buffer()  # Drop boot-time chatter
+
+                # Keep the port permanently drained on a background thread;
+                # send_command just pulls lines off the receive queue
+                Thread(target=self._reader, args=(self.connection,), daemon=True).start()
+
                 # Test connection
                 response = self.send_command("STATUS", wait_for_ready=True)
                 if response and "OK" in response:
@@ -124,7 +192,39 @@ class ArduinoController:
         
         logger.error("Failed to connect to Arduino after all retries")
         return False
-    
+
+    def _enable_low_latency(self):
+        """Set the FTDI low-latency flag on Linux (latency timer 16ms -> 1ms)"""
+        if not sys.platform.startswith('linux'):
+            return
+        try:
+            import array
+            import fcntl
+            import termios
+            ASYNC_LOW_LATENCY = 1 << 13
+            fd = self.connection.fileno()
+            buf = array.array('i', [0] * 64)  # struct serial_struct
+            fcntl.ioctl(fd, termios.TIOCGSERIAL, buf)
+            buf[4] |= ASYNC_LOW_LATENCY  # flags field
+            fcntl.ioctl(fd, termios.TIOCSSERIAL, buf)
+            logger.info("Serial low-latency mode enabled")
+        except (OSError, ImportError) as e:
+            # Not an FTDI adapter (or no permission) - harmless, just slower
+            logger.debug(f"Could not enable serial low-latency mode: {e}")
+
+    def _reader(self, connection):
+        """Drain the serial port into the receive queue (daemon thread)"""
+        while True:
+            try:
+                raw = connection.readline()
+            except (serial.SerialException, OSError):
+                break  # Port closed
+            if self.connection is not connection:
+                break  # Connection was replaced by a reconnect
+            line = raw.decode('utf-8', errors='replace').strip()
+            if line:
+                self._rx_q.put(line)
+
     def send_command(self, command: str, wait_for_ready: bool = True) -> Optional[str]:
         """Send command to Arduino and get response"""
         if not self.connected or not self.connection:
@@ -132,30 +232,46 @@ class ArduinoController:
             return None
         
         try:
+            # The lock covers the whole write+read transaction - replies carry
+            # no command id, so a concurrent caller draining the same queue
+            # would cross-consume responses. The blocking queue read keeps the
+            # command at one RTT; the full 8s hold only happens when the
+            # Arduino is dead.
             with arduino_lock:
-                # Send command
-                command_bytes = (command + '\n').encode('utf-8')
+                # Drop stale lines left over from a previous command
+                while True:
+                    try:
+                        self._rx_q.get_nowait()
+                    except queue.Empty:
+                        break
+
+                command_bytes = self._cmd_bytes.get(command) or (command + '\n').encode('ascii')
                 self.connection.write(command_bytes)
                 self.connection.flush()
-                
-                logger.info(f"Sent to Arduino: {command}")
-                
-                # Read response
+
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info(f"Sent to Arduino: {command}")
+
+                # Collect response lines pushed by the reader thread
                 response_lines = []
-                timeout_start = time.time()
-                
-                while time.time() - timeout_start < 8:  # 8 second timeout
-                    if self.connection.in_waiting:
-                        line = self.connection.readline().decode('utf-8').strip()
-                        if line:
-                            response_lines.append(line)
-                            logger.info(f"Arduino: {line}")
-                            
-                            # Check if Arduino is ready
-                            if wait_for_ready and line == "READY":
-                                break
-                    time.sleep(0.1)
-                
+                deadline = time.monotonic() + 8  # 8 second timeout
+
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        line = self._rx_q.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+
+                    response_lines.append(line)
+                    logger.info(f"Arduino: {line}")
+
+                    # Check if Arduino is ready
+                    if wait_for_ready and line == "READY":
+                        break
+
                 return '\n'.join(response_lines)
                 
         except Exception as e:
@@ -163,26 +279,40 @@ class ArduinoController:
             self.connected = False
             return None
     
-    def move_servo(self, direction: str) -> bool:
-        """Move servo to specified direction"""
+    def move_servo(self, direction: str, force: bool = False) -> bool:
+        """Move servo to specified direction
+
+        LEFT/RIGHT are one-shot divert actuations - the firmware holds the
+        position briefly and then returns to center on its own - so they are
+        always sent. Only a redundant CENTER command is skipped (unless force
+        is set), since center is the one resting position in the sketch.
+        """
         direction = direction.upper()
         if direction not in ['LEFT', 'RIGHT', 'CENTER']:
             logger.error(f"Invalid servo direction: {direction}")
             return False
-        
+
+        if not force and direction == 'CENTER' and self._at_center:
+            logger.info("Servo already centered, skipping move")
+            return True
+
         response = self.send_command(direction, wait_for_ready=True)
         success = response is not None and "ERROR" not in response
-        
+
         if success:
+            # Every successful command leaves the servo centered: CENTER
+            # directly, LEFT/RIGHT via the firmware's auto-return
+            self._at_center = True
             logger.info(f"Servo moved to {direction} successfully")
             # Update movement statistics
             if direction == 'LEFT':
-                stats['left_movements'] += 1
+                bump('left_movements')
             elif direction == 'RIGHT':
-                stats['right_movements'] += 1
+                bump('right_movements')
         else:
+            self._at_center = False  # Position unknown after a failure
             logger.error(f"Failed to move servo to {direction}")
-            stats['errors'] += 1
+            bump('errors')
             
         return success
     
@@ -208,9 +338,15 @@ class ArduinoController:
 
 class MLSortingAnalyzer:
     """Enhanced version of your E-waste analyzer for real-time sorting"""
-    
+
+    CACHE_SIZE = 256  # Decisions remembered for duplicate frames
+
     def __init__(self):
         self.ai_model = genai.GenerativeModel('gemini-2.0-flash-exp')
+
+        # LRU of recent decisions keyed by image hash - phones on a belt
+        # often resend the same frame, and a cache hit skips the Gemini trip
+        self._cache = OrderedDict()
         
         # Load your existing prompt
         try:
@@ -262,19 +398,54 @@ class MLSortingAnalyzer:
             },
             "required": ["item_name", "safety_level", "sorting_direction", "confidence", "hazards", "notes"]
         }
-    
+
+        # Built once here - the SDK re-normalizes the response schema every
+        # time a fresh GenerationConfig is constructed, and the prompt never
+        # changes between images
+        self._gen_config = genai.GenerationConfig(
+            response_mime_type="application/json",
+            response_schema=self.response_format,
+            temperature=0.1
+        )
+        self._sorting_prompt = f"""
+            {self.instructions}
+
+            IMPORTANT: Based on your analysis, decide sorting direction:
+            - LEFT: Safe items that can be shredded normally (Safe to Shred)
+            - RIGHT: Items needing special handling (Requires Preprocessing, Do Not Shred, or Discard)
+
+            Consider safety as the top priority. When in doubt, choose RIGHT for safer handling.
+            """
+
     def analyze_image_for_sorting(self, image_path: str) -> Dict:
         """
-        Analyze image and return sorting decision
-        
+        Analyze an image file on disk and return sorting decision
+
         Args:
             image_path: Path to the image file
-            
+
+        Returns:
+            Dictionary with ML analysis and sorting decision
+        """
+        with open(image_path, 'rb') as f:
+            image_bytes = f.read()
+        mime_type = guess_mime_type(image_path)
+        return self.analyze_bytes(image_bytes, mime_type, filename=os.path.basename(image_path))
+
+    def analyze_bytes(self, image_bytes: bytes, mime_type: str, filename: str = "upload") -> Dict:
+        """
+        Analyze in-memory image bytes and return sorting decision
+
+        Args:
+            image_bytes: Raw image data
+            mime_type: Image MIME type (e.g. image/jpeg)
+            filename: Original filename, for logging and the result payload
+
         Returns:
             Dictionary with ML analysis and sorting decision
         """
         result = {
-            "filename": os.path.basename(image_path),
+            "filename": filename,
             "timestamp": datetime.now().isoformat(),
             "item_name": "Unknown",
             "safety_level": "Do Not Shred",  # Default to safe option
@@ -284,32 +455,27 @@ class MLSortingAnalyzer:
             "notes": "Analysis failed",
             "error": None
         }
-        
+
+        # Duplicate frame? Reuse the previous decision instead of paying for
+        # another Gemini round trip
+        image_hash = hashlib.blake2b(image_bytes, digest_size=16).digest()
+        cached = self._cache.get(image_hash)
+        if cached is not None:
+            self._cache.move_to_end(image_hash)
+            bump('cache_hits')
+            logger.info(f"Duplicate image {filename}, reusing cached decision: {cached['item_name']}")
+            result = dict(cached)
+            result['filename'] = filename
+            result['timestamp'] = datetime.now().isoformat()
+            return result
+
         try:
-            logger.info(f"Analyzing image: {image_path}")
-            
-            # Upload image to Google AI
-            uploaded_image = genai.upload_file(image_path)
-            
-            # Enhanced prompt for sorting decisions
-            sorting_prompt = f"""
-            {self.instructions}
-            
-            IMPORTANT: Based on your analysis, decide sorting direction:
-            - LEFT: Safe items that can be shredded normally (Safe to Shred)
-            - RIGHT: Items needing special handling (Requires Preprocessing, Do Not Shred, or Discard)
-            
-            Consider safety as the top priority. When in doubt, choose RIGHT for safer handling.
-            """
-            
+            logger.info(f"Analyzing image: {filename}")
+
             # Generate analysis
             response = self.ai_model.generate_content(
-                [sorting_prompt, uploaded_image],
-                generation_config=genai.GenerationConfig(
-                    response_mime_type="application/json",
-                    response_schema=self.response_format,
-                    temperature=0.1
-                )
+                [{"mime_type": mime_type, "data": image_bytes}, self._sorting_prompt],
+                generation_config=self._gen_config
             )
             
             # Parse response
@@ -319,31 +485,72 @@ class MLSortingAnalyzer:
             logger.info(f"ML Analysis complete: {result['item_name']} -> {result['sorting_direction']} (confidence: {result['confidence']:.2f})")
             
             # Update statistics
-            stats['total_processed'] += 1
+            bump('total_processed')
             safety_level = result['safety_level']
             if safety_level == "Safe to Shred":
-                stats['safe_to_shred'] += 1
+                bump('safe_to_shred')
             elif safety_level == "Requires Preprocessing":
-                stats['requires_preprocessing'] += 1
+                bump('requires_preprocessing')
             elif safety_level == "Do Not Shred":
-                stats['do_not_shred'] += 1
+                bump('do_not_shred')
             elif safety_level == "Discard":
-                stats['discard_items'] += 1
-            
+                bump('discard_items')
+
+            # Remember the decision for duplicate frames
+            self._cache[image_hash] = dict(result)
+            if len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False)
+
         except Exception as error:
             result["error"] = str(error)
-            logger.error(f"ML analysis failed for {image_path}: {error}")
-            stats['errors'] += 1
+            logger.error(f"ML analysis failed for {filename}: {error}")
+            bump('errors')
         
         return result
 
+# ============================================================================
+# SORTING WORKER
+# ============================================================================
+
+def sorting_worker():
+    """Consume queued images and run the slow ML + servo stages"""
+    while True:
+        image_bytes, mime_type, filename, job_id = job_queue.get()
+        try:
+            ml_result = ml_analyzer.analyze_bytes(image_bytes, mime_type, filename=filename)
+
+            if ml_result.get('error'):
+                ml_result['status'] = 'error'
+            else:
+                # Execute servo movement based on ML decision
+                direction = ml_result['sorting_direction'].upper()
+                servo_success = arduino_connection.move_servo(direction)
+
+                if servo_success:
+                    ml_result['status'] = 'success'
+                    ml_result['servo_action'] = f"Moved servo {direction}"
+                    logger.info(f"Complete sorting cycle successful: {ml_result['item_name']} -> {direction}")
+                else:
+                    ml_result['status'] = 'partial_success'
+                    ml_result['servo_action'] = 'Servo movement failed'
+                    bump('errors')
+
+            store_result(job_id, ml_result)
+
+        except Exception as e:
+            logger.error(f"Sorting worker error for job {job_id}: {e}")
+            bump('errors')
+            store_result(job_id, {'status': 'error', 'error': str(e)})
+        finally:
+            job_queue.task_done()
+
 # ============================================================================
 # FLASK WEB API
 # ============================================================================
 
 @app.route('/api/upload_image', methods=['POST'])
 def upload_image():
-    """Main endpoint for phone to upload images"""
+    """Main endpoint for phone to upload images (queues work, returns 202)"""
     try:
         # Check Arduino connection
         if not arduino_connection or not arduino_connection.connected:
@@ -351,127 +558,142 @@ def upload_image():
                 'status': 'error',
                 'message': 'Arduino not connected'
             }), 503
-        
+
         # Check for image in request
         if 'image' not in request.files:
             return jsonify({
-                'status': 'error', 
+                'status': 'error',
                 'message': 'No image provided'
             }), 400
-        
+
         image_file = request.files['image']
         if image_file.filename == '':
             return jsonify({
                 'status': 'error',
                 'message': 'No image selected'
             }), 400
-        
-        # Save uploaded image
+
+        # Keep the bytes in memory for analysis; Werkzeug already has them
+        # buffered, so re-reading them off disk would just double the I/O
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')[:-3]  # milliseconds
         filename = f"ewaste_{timestamp}_{image_file.filename}"
         image_path = os.path.join(UPLOAD_FOLDER, filename)
-        
-        image_file.save(image_path)
-        logger.info(f"Image saved: {filename}")
-        
-        # Analyze with ML
-        ml_result = ml_analyzer.analyze_image_for_sorting(image_path)
-        
-        if ml_result.get('error'):
+
+        image_bytes = image_file.read()
+        mime_type = guess_mime_type(image_file.filename)
+
+        # Persist to disk off-thread for the audit trail
+        Thread(target=persist_image, args=(image_path, image_bytes), daemon=True).start()
+
+        # Hand off to the sorting worker so this request only pays for the
+        # in-memory read, not the ML round trip
+        job_id = uuid.uuid4().hex
+        with state_lock:
+            pending_jobs.add(job_id)
+        try:
+            job_queue.put_nowait((image_bytes, mime_type, filename, job_id))
+        except queue.Full:
+            with state_lock:
+                pending_jobs.discard(job_id)
             return jsonify({
                 'status': 'error',
-                'message': f"ML analysis failed: {ml_result['error']}",
+                'message': 'Sorting queue full, try again shortly',
                 'filename': filename
-            }), 500
-        
-        # Execute servo movement based on ML decision
-        direction = ml_result['sorting_direction'].upper()
-        servo_success = arduino_connection.move_servo(direction)
-        
-        if servo_success:
-            response = {
-                'status': 'success',
-                'filename': filename,
-                'ml_analysis': {
-                    'item_name': ml_result['item_name'],
-                    'safety_level': ml_result['safety_level'],
-                    'sorting_direction': ml_result['sorting_direction'],
-                    'confidence': ml_result['confidence'],
-                    'hazards': ml_result['hazards'],
-                    'notes': ml_result['notes']
-                },
-                'servo_action': f"Moved servo {direction}",
-                'timestamp': ml_result['timestamp'],
-                'stats': stats.copy()
-            }
-            
-            logger.info(f"Complete sorting cycle successful: {ml_result['item_name']} -> {direction}")
-            return jsonify(response), 200
-        else:
-            stats['errors'] += 1
-            return jsonify({
-                'status': 'partial_success',
-                'message': 'ML analysis completed but servo movement failed',
-                'ml_analysis': ml_result,
-                'filename': filename
-            }), 207  # Multi-status
-            
+            }), 503
+
+        return jsonify({
+            'status': 'queued',
+            'job_id': job_id,
+            'filename': filename
+        }), 202
+
     except Exception as e:
         logger.error(f"Error in upload_image: {e}")
-        stats['errors'] += 1
+        bump('errors')
         return jsonify({
             'status': 'error',
             'message': f'Server error: {str(e)}'
         }), 500
 
+@app.route('/api/result/<job_id>', methods=['GET'])
+def get_result(job_id):
+    """Fetch the sorting result for a queued upload"""
+    with state_lock:
+        result = results_cache.get(job_id)
+        still_pending = job_id in pending_jobs
+
+    if result is not None:
+        return jsonify(result), 200
+
+    if still_pending:
+        return jsonify({
+            'status': 'pending',
+            'job_id': job_id
+        }), 200
+
+    return jsonify({
+        'status': 'error',
+        'message': 'Unknown or expired job id',
+        'job_id': job_id
+    }), 404
+
 @app.route('/api/status', methods=['GET'])
 def get_status():
     """Get system status and statistics"""
-    uptime = datetime.now() - stats['start_time']
-    
+    uptime = datetime.now() - _start_time
+
     return jsonify({
         'status': 'online',
         'arduino_connected': arduino_connection.connected if arduino_connection else False,
         'uptime_seconds': uptime.total_seconds(),
         'ml_analyzer_ready': ml_analyzer is not None,
-        'stats': stats,
+        'stats': stats_snapshot(),
         'timestamp': datetime.now().isoformat()
     }), 200
 
-@app.route('/api/manual_sort', methods=['POST'])
-def manual_sort():
-    """Manual servo control for testing"""
+def _manual_servo_move(force: bool):
+    """Shared handler for the manual servo control endpoints"""
     try:
         data = request.get_json()
         direction = data.get('direction', '').upper()
-        
+
         if direction not in ['LEFT', 'RIGHT', 'CENTER']:
             return jsonify({
                 'status': 'error',
                 'message': 'Invalid direction. Use LEFT, RIGHT, or CENTER'
             }), 400
-        
+
         if not arduino_connection or not arduino_connection.connected:
             return jsonify({
                 'status': 'error',
                 'message': 'Arduino not connected'
             }), 503
-        
-        success = arduino_connection.move_servo(direction)
-        
+
+        success = arduino_connection.move_servo(direction, force=force)
+
         return jsonify({
             'status': 'success' if success else 'error',
             'direction': direction,
             'message': f"Servo {'moved' if success else 'failed to move'} {direction}"
         }), 200 if success else 500
-        
+
     except Exception as e:
-        logger.error(f"Error in manual_sort: {e}")
+        logger.error(f"Error in manual servo move: {e}")
         return jsonify({
             'status': 'error',
             'message': str(e)
         }), 500
 
+@app.route('/api/manual_sort', methods=['POST'])
+def manual_sort():
+    """Manual servo control for testing"""
+    return _manual_servo_move(force=False)
+
+@app.route('/api/force_move', methods=['POST'])
+def force_move():
+    """Manual servo control that bypasses the centered-servo debounce"""
+    return _manual_servo_move(force=True)
+
 @app.route('/api/test_system', methods=['POST'])
 def test_system():
     """Test complete system functionality"""
@@ -504,64 +726,63 @@ def test_system():
             'message': str(e)
         }), 500
 
-@app.route('/', methods=['GET'])
-def index():
-    """Simple web interface showing system info"""
-    return f'''
+# Static HTML shell built once at import time; index() only swaps in the
+# handful of live values instead of re-formatting the whole page per hit
+INDEX_SHELL = '''
     <!DOCTYPE html>
     <html>
     <head>
         <title>ML E-Waste Sorting System</title>
         <style>
-            body {{ font-family: Arial, sans-serif; padding: 20px; background: #f5f5f5; }}
-            .container {{ max-width: 800px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-            .status {{ padding: 15px; margin: 10px 0; border-radius: 5px; }}
-            .online {{ background: #d4edda; color: #155724; border: 1px solid #c3e6cb; }}
-            .offline {{ background: #f8d7da; color: #721c24; border: 1px solid #f5c6cb; }}
-            .stats {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 15px; margin: 20px 0; }}
-            .stat-box {{ background: #e9ecef; padding: 15px; border-radius: 8px; text-align: center; }}
-            .endpoint {{ background: #f8f9fa; padding: 10px; margin: 5px 0; border-radius: 5px; font-family: monospace; }}
+            body { font-family: Arial, sans-serif; padding: 20px; background: #f5f5f5; }
+            .container { max-width: 800px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
+            .status { padding: 15px; margin: 10px 0; border-radius: 5px; }
+            .online { background: #d4edda; color: #155724; border: 1px solid #c3e6cb; }
+            .offline { background: #f8d7da; color: #721c24; border: 1px solid #f5c6cb; }
+            .stats { display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 15px; margin: 20px 0; }
+            .stat-box { background: #e9ecef; padding: 15px; border-radius: 8px; text-align: center; }
+            .endpoint { background: #f8f9fa; padding: 10px; margin: 5px 0; border-radius: 5px; font-family: monospace; }
         </style>
     </head>
     <body>
         <div class="container">
             <h1>🤖 ML E-Waste Sorting System</h1>
             <p>Automated electronic waste sorting using AI analysis and servo control</p>
-            
-            <div class="status {'online' if arduino_connection and arduino_connection.connected else 'offline'}">
-                Arduino Status: {'Connected ✅' if arduino_connection and arduino_connection.connected else 'Disconnected ❌'}
+
+            <div class="status {{ARDUINO_CLASS}}">
+                Arduino Status: {{ARDUINO_TEXT}}
             </div>
-            
-            <div class="status {'online' if ml_analyzer else 'offline'}">
-                ML Analyzer Status: {'Ready ✅' if ml_analyzer else 'Not Ready ❌'}
+
+            <div class="status {{ML_CLASS}}">
+                ML Analyzer Status: {{ML_TEXT}}
             </div>
-            
+
             <h3>📊 Statistics</h3>
             <div class="stats">
                 <div class="stat-box">
                     <h4>Total Processed</h4>
-                    <p>{stats['total_processed']}</p>
+                    <p>{{TOTAL}}</p>
                 </div>
                 <div class="stat-box">
                     <h4>Safe to Shred</h4>
-                    <p>{stats['safe_to_shred']}</p>
+                    <p>{{SAFE}}</p>
                 </div>
                 <div class="stat-box">
                     <h4>Special Handling</h4>
-                    <p>{stats['requires_preprocessing'] + stats['do_not_shred']}</p>
+                    <p>{{SPECIAL}}</p>
                 </div>
                 <div class="stat-box">
                     <h4>Errors</h4>
-                    <p>{stats['errors']}</p>
+                    <p>{{ERRORS}}</p>
                 </div>
             </div>
-            
+
             <h3>📱 Phone App Endpoints</h3>
             <div class="endpoint">POST /api/upload_image - Upload image for analysis and sorting</div>
             <div class="endpoint">GET /api/status - Get system status</div>
             <div class="endpoint">POST /api/manual_sort - Manual servo control</div>
             <div class="endpoint">POST /api/test_system - Test all components</div>
-            
+
             <h3>🔧 Setup Instructions</h3>
             <ol>
                 <li>Ensure Arduino is connected and running the servo control code</li>
@@ -574,6 +795,25 @@ def index():
     </html>
     '''
 
+@app.route('/', methods=['GET'])
+def index():
+    """Simple web interface showing system info"""
+    arduino_online = arduino_connection is not None and arduino_connection.connected
+    snapshot = stats_snapshot()
+    html = INDEX_SHELL
+    for token, value in (
+        ('{{ARDUINO_CLASS}}', 'online' if arduino_online else 'offline'),
+        ('{{ARDUINO_TEXT}}', 'Connected ✅' if arduino_online else 'Disconnected ❌'),
+        ('{{ML_CLASS}}', 'online' if ml_analyzer else 'offline'),
+        ('{{ML_TEXT}}', 'Ready ✅' if ml_analyzer else 'Not Ready ❌'),
+        ('{{TOTAL}}', str(snapshot['total_processed'])),
+        ('{{SAFE}}', str(snapshot['safe_to_shred'])),
+        ('{{SPECIAL}}', str(snapshot['requires_preprocessing'] + snapshot['do_not_shred'])),
+        ('{{ERRORS}}', str(snapshot['errors'])),
+    ):
+        html = html.replace(token, value)
+    return html
+
 # ============================================================================
 # MAIN SYSTEM INITIALIZATION
 # ============================================================================
@@ -607,7 +847,11 @@ def initialize_system():
     except Exception as e:
         logger.error(f"Arduino initialization error: {e}")
         return False
-    
+
+    # Start the sorting pipeline worker
+    Thread(target=sorting_worker, daemon=True).start()
+    logger.info("Sorting worker thread started")
+
     return True
 
 def main():
@@ -635,8 +879,16 @@ def main():
         logger.info(f"Phone endpoint: http://{local_ip}:{FLASK_PORT}/api/upload_image")
         logger.info("System ready for phone camera input...")
         
-        # Start Flask server
-        app.run(host=FLASK_HOST, port=FLASK_PORT, debug=False, threaded=True)
+        # Start the web server - waitress gives us a bounded thread pool and
+        # keep-alive instead of Werkzeug's thread-per-request dev server
+        try:
+            from waitress import serve
+            serve(app, host=FLASK_HOST, port=FLASK_PORT,
+                  threads=4, connection_limit=64, channel_timeout=30)
+        except ImportError:
+            logger.warning("waitress not installed, falling back to Flask dev server")
+            logger.warning("   pip install waitress")
+            app.run(host=FLASK_HOST, port=FLASK_PORT, debug=False, threaded=True)
         
     except KeyboardInterrupt:
         logger.info("Shutdown requested by user...")
@@ -648,6 +900,7 @@ def main():
         if arduino_connection:
             arduino_connection.disconnect()
         logger.info("System shutdown complete")
+        log_listener.stop()  # Flush queued log records before exit
     
     return 0
 